@@ -7,6 +7,7 @@ __date__ = 10/10/23
 import argparse
 import os
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from make_table import parse_ref, parse_scores
 
@@ -25,9 +26,10 @@ def get_table(method: str, bucket: str) -> pd.DataFrame:
     new_scores = {}
     for ref, score_list in scores.items():
         if ref in ['RV11', 'RV12']:
-            new_scores['RV11/RV12'] = new_scores.get('RV11/RV12', []) + score_list  #\\NOSONAR
+            new_scores.setdefault('RV11/RV12', []).append(score_list)
         elif ref in ['RV911', 'RV912', 'RV913']:
-            new_scores['RV911/RV912/RV913'] = new_scores.get('RV911/RV912/RV913', []) + score_list  #\\NOSONAR
+            new_scores.setdefault('RV911/RV912/RV913', []).append(score_list)
+    new_scores = {refs: np.concatenate(arrays) for refs, arrays in new_scores.items()}
     table = parse_scores(new_scores, bucket)
 
     return table
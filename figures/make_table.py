@@ -7,31 +7,35 @@ __date__ = 10/10/23
 
 import os
 import argparse
+from glob import glob
+import numpy as np
 import pandas as pd
 
+# Upper bound (inclusive) of first bucket, width of each bucket, and number of buckets
+# for length (0-499, 500-999, ...) and pairwise id (0-9, 10-19, ...)
+BUCKETS = {'len': (499, 500, 5), 'id': (9, 10, 10)}
+
 
 def parse_ref(method: str, bucket: str) -> dict:
     """Returns a dict of ref alignments and each alignment's sim score OR length and SP score.
 
     :param method: directory containing alignments
     :param bucket: value of interest for bucketing (id or len)
-    :return dict: dict where key is reference name and value is a list of tuples
+    :return dict: dict where key is reference name and value is an array of (value, SP) rows
     """
 
+    # SP on column 3, length on column 5, sim on column 9
+    cols = [5, 3] if bucket == 'len' else [9, 3]
+
     # For each log file in directory, get sim score OR ref align length and SP score
     refs = {}
-    for file in os.listdir(method):
-        if file.endswith('.log'):
-            refs[file.split('_')[0]] = []
-            with open(f'{method}/{file}', 'r', encoding='utf8') as lfile:
-                for line in lfile:
-                    line = line.split()
-
-                    # SP on line[3], length on line[5], sim on line[9]
-                    if bucket == 'len':
-                        refs[file.split('_')[0]].append((line[5], line[3]))
-                    if bucket == 'id':
-                        refs[file.split('_')[0]].append((line[9], line[3]))
+    for path in glob(f'{method}/*.log'):
+        ref = os.path.basename(path).split('_')[0]
+        if os.path.getsize(path) == 0:  # read_csv can't parse an empty file
+            refs[ref] = np.empty((0, 2))
+            continue
+        log = pd.read_csv(path, sep=r'\s+', header=None, usecols=cols, dtype=float)
+        refs[ref] = log[cols].to_numpy()
     refs = dict(sorted(refs.items()))
 
     return refs
@@ -41,7 +45,7 @@ def get_table(value: str, scores: dict) -> pd.DataFrame:
     """Returns a pandas dataframe with appropriate column names for the desired value
 
     :param value: value of interest for bucketing (id or len)
-    :param scores: dict where key is reference name and value is a list of tuples
+    :param scores: dict where key is reference name and value is an array of (value, SP) rows
     :return pd.DataFrame: pandas dataframe
     """
 
@@ -56,37 +60,35 @@ def get_table(value: str, scores: dict) -> pd.DataFrame:
     return table
 
 
-def put_scores(id_dict: dict, scores: dict, ref: str, value: str) -> dict:
-    """Adds SP scores to appropriate bucket in dict
+def put_scores(scores: dict, ref: str, value: str) -> tuple:
+    """Returns the sum and number of SP scores in each bucket
 
-    :param id_dict: dict where key is bucket and value is list of SP scores
-    :param scores: dict where key is reference name and value is a list of tuples
+    :param scores: dict where key is reference name and value is an array of (value, SP) rows
     :param ref: reference name
     :param value: value of interest for bucketing (id or len)
-    :return dict: dict where key is bucket and value is list of SP scores
+    :return (np.ndarray, np.ndarray): sum and number of SP scores in each bucket
     """
 
-    for score in scores[ref]:
-
-        # Change value to int if bucketing by length
-        if value == 'len':
-            score = (int(score[0]), float(score[1]))
-        if value == 'id':  # Otherwise change value to a percentage
-            score = (float(score[0])*100, float(score[1]))
+    # Change value to a percentage if bucketing by id
+    values, sp_scores = scores[ref].T.copy()
+    if value == 'id':
+        values *= 100
 
-        # Add SP score to appropriate bucket
-        for bucket in id_dict:  #pylint: disable=C0206
-            if score[0] <= bucket:
-                id_dict[bucket].append(float(score[1]))
-                break  # Only add to one bucket
+    # Buckets are evenly spaced so the bucket each value fits in can be computed directly,
+    # values past the last bucket are not counted
+    first, width, count = BUCKETS[value]
+    idx = np.ceil((values - first) / width).clip(min=0).astype(int)
+    keep = idx < count
+    sums = np.bincount(idx[keep], weights=sp_scores[keep], minlength=count)
+    counts = np.bincount(idx[keep], minlength=count)
 
-    return id_dict
+    return sums, counts
 
 
-def parse_scores(scores: dict, value: str) -> pd.DataFrame:  #\\NOSONAR
+def parse_scores(scores: dict, value: str) -> pd.DataFrame:
     """Prints a pandas table of the average SP score for each bucket of pairwise id
 
-    :param scores: dict where key is reference name and value is a list of tuples
+    :param scores: dict where key is reference name and value is an array of (value, SP) rows
     :param value: value of interest for bucketing (id or len)
     :return pd.DataFrame: pandas table of average SP score for each bucket
     """
@@ -94,27 +96,12 @@ def parse_scores(scores: dict, value: str) -> pd.DataFrame:  #\\NOSONAR
     # For each reference in dict, add SP score to appropriate bucket
     table = get_table(value, scores)
     for ref in scores:
+        sums, counts = put_scores(scores, ref, value)
 
-        # Create dict of lists for each bucket
-        if value == 'len':
-            value_dict = {499: [], 999: [], 1499: [], 1999: [], 2499: []}
-        if value == 'id':
-            value_dict = {9: [], 19: [], 29: [], 39: [], 49: [],
-                    59: [], 69: [], 79: [], 89: [], 99: []}
-
-        # Add SP score to appropriate bucket
-        value_dict = put_scores(value_dict, scores, ref, value)
-
-        # Get average SP score for each bucket
-        for bucket, score_list in value_dict.items():
-            if len(score_list) <= 10:
-                value_dict[bucket] = 0
-                continue
-            value_dict[bucket] = round(sum(score_list)/len(score_list), 2)
-
-        # Add row to table, each value in dict is a column
-        for i, bucket in enumerate(value_dict):
-            table.iloc[table.index.get_loc(ref), i] = value_dict[bucket]
+        # Get average SP score for each bucket, add row to table
+        averages = [round(total/count, 2) if count > 10 else 0
+                     for total, count in zip(sums, counts)]
+        table.iloc[table.index.get_loc(ref), :] = averages
 
     return table
 
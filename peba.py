@@ -32,6 +32,10 @@ def score_align(seq1: str, seq2: str, vecs1: list, vecs2:list,
     # Initialize scoring and traceback matrix based on sequence lengths
     score_m, trace_m = ut.initialize_matrices(seq1, seq2, align, gopen, gext)
 
+    # Embeddings may be stored at lower precision, always score in float64
+    vecs1 = np.asarray(vecs1, dtype=np.float64)
+    vecs2 = np.asarray(vecs2, dtype=np.float64)
+
     # Score matrix by moving through each index
     gap = False
     for i in range(len(seq1)):
@@ -66,6 +70,31 @@ def score_align(seq1: str, seq2: str, vecs1: list, vecs2:list,
     return score_m, trace_m
 
 
+def align_seqs(seq1: str, seq2: str, vecs1: list, vecs2: list,
+                gopen: float, gext: float, align: str) -> tuple:
+    """Returns the highest scoring alignment of two sequences using the cosine similarity
+    between their embedded amino acids
+
+    :param seq1: first sequence
+    :param seq2: second sequence
+    :param vecs1: first sequence's amino acid vectors
+    :param vecs2: second sequence's amino acid vectors
+    :param gopen: gap penalty for opening a new gap
+    :param gext: gap penalty for extending a gap
+    :param align: alignment type (global or local)
+    return (str, str, list, list): aligned sequences, beg/end positions of each seq
+    """
+
+    score_m, trace_m = score_align(seq1, seq2, vecs1, vecs2, gopen, gext, align)
+    if align == 'global':
+        align1, align2 = ut.global_traceback(trace_m, seq1, seq2)
+        beg, end = [0, 0], [len(seq1), len(seq2)]
+    if align == 'local':
+        align1, align2, beg, end = ut.local_traceback(score_m, trace_m, seq1, seq2)
+
+    return align1, align2, beg, end
+
+
 def main():
     """Initializes two protein sequences, embeds them if embeddings are not provided, calls
     local_align() to obtain the scoring and traceback matrix from local alignment (with cosine
@@ -120,12 +149,8 @@ def main():
         vecs2 = np.loadtxt(args.embed2)
 
     # Align and traceback
-    score_m, trace_m = score_align(seq1, seq2, vecs1, vecs2, args.gopen, args.gext, args.align)
-    if args.align == 'global':
-        align1, align2 = ut.global_traceback(trace_m, seq1, seq2)
-        beg, end = [0, 0], [len(seq1), len(seq2)]
-    if args.align == 'local':
-        align1, align2, beg, end = ut.local_traceback(score_m, trace_m, seq1, seq2)
+    align1, align2, beg, end = align_seqs(seq1, seq2, vecs1, vecs2,
+                                           args.gopen, args.gext, args.align)
 
     # Write align based on desired output format
     if args.output == 'msf':
@@ -8,7 +8,23 @@ __date__ = 09/22/23
 import argparse
 import logging
 import os
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+import compute_score as cs
+
+
+def compare_pair(task: tuple) -> str:
+    """Returns the score between an alignment and its reference alignment
+
+    :param task: (ref_align, align, score) paths to both alignments and score to compare (sp/f1)
+    :return str: score from compute_score, or the error if the alignments couldn't be compared
+    """
+
+    ref_align, align, score = task
+    try:
+        return cs.compare_aligns(ref_align, align, score)
+    except Exception as err:  #pylint: disable=W0718
+        return f'{type(err).__name__}: {err}'
 
 
 def main():
@@ -19,6 +35,7 @@ def main():
     parser.add_argument('-m', type=str, default='data/alignments/vcmsa')
     parser.add_argument('-r', type=str, default='RV913', help='reference to compare to')
     parser.add_argument('-s', type=str, default='sp', help='score to compare (sp/f1)')
+    parser.add_argument('-p', type=int, default=os.cpu_count(), help='number of processes')
     args = parser.parse_args()
 
     log_filename = f'{args.m}/{args.r}_{args.s}.log'  #pylint: disable=C0103
@@ -26,18 +43,15 @@ def main():
                      level=logging.INFO, format='%(message)s')
 
     # Compare alignments in directory to corresponding reference alignments
-    direcs = sorted(os.listdir(f'{args.m}/{args.r}'))
-    for direc in direcs:
-        for align in os.listdir(f'{args.m}/{args.r}/{direc}'):
-
-            # Call compute_score
-            score = subprocess.getoutput(
-                f'python scripts/compute_score.py '
-                f'-align1 data/alignments/refs/{args.r}/{direc}/{align} '
-                f'-align2 {args.m}/{args.r}/{direc}/{align} '
-                f'-score {args.s}')
-
-            # Write results to log
+    paths = sorted(glob(f'{args.m}/{args.r}/*/*'))
+    names = [path.split('/')[-2:] for path in paths]
+    tasks = [(f'data/alignments/refs/{args.r}/{direc}/{align}', path, args.s)
+              for path, (direc, align) in zip(paths, names)]
+    with ProcessPoolExecutor(max_workers=args.p) as executor:
+        scores = executor.map(compare_pair, tasks, chunksize=32)
+
+        # Write results to log
+        for (direc, align), score in zip(names, scores):
             logging.info('%s, %s, %s', direc, align, score)
 
 
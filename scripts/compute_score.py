@@ -120,12 +120,12 @@ def get_shared(al1: dict, al2: dict) -> tuple:
     return shared_pairs, total, sim
 
 
-def sp_score(al1: dict, al2: dict) -> tuple:
+def sp_score(al1: dict, al2: dict) -> str:
     """Returns sum of pairs (sp) score between two alignments.
 
     :param al1: dict where keys are positions of aligned residues and values are matched positions
     :param al2: dict same as al1
-    :return (float, float): similarity and sp scores
+    :return str: sp score, lengths, and similarity
     """
 
     shared_pairs, total, sim = get_shared(al1, al2)
@@ -133,16 +133,17 @@ def sp_score(al1: dict, al2: dict) -> tuple:
     # sp is (shared pairs between ref/test align) / (total number of pairs in ref align)
     score = round(shared_pairs/total, 3)
     sim = round(sim/total, 3)
-    logger.info('SP: %s   ref_length: %s   comparison_length: %s   similarity: %s',
-            score, len(al1.values()), total, sim)
 
+    return (f'SP: {score}   ref_length: {len(al1.values())}   '
+            f'comparison_length: {total}   similarity: {sim}')
 
-def f1_score(al1: dict, al2: dict) -> tuple:
+
+def f1_score(al1: dict, al2: dict) -> str:
     """Returns F1 score between two alignments.
 
     :param al1: dict where keys are positions of aligned residues and values are matched positions
     :param al2: dict same as al1
-    :return (float, float): 
+    :return str: f1 score, lengths, and similarity
     """
 
     shared_pairs, total, sim = get_shared(al1, al2)
@@ -163,26 +164,29 @@ def f1_score(al1: dict, al2: dict) -> tuple:
         score = round(score, 3)
 
     sim = round(sim/total, 3)
-    logger.info('F1: %s   ref_length: %s   comparison_length: %s   similarity: %s',
-            score, len(al1.values()), len(al1.values()), sim)
+
+    return (f'F1: {score}   ref_length: {len(al1.values())}   '
+            f'comparison_length: {len(al1.values())}   similarity: {sim}')
 
 
-def compare_aligns(args: argparse.Namespace) -> float:
+def compare_aligns(align1: str, align2: str, score: str) -> str:
     """Returns score between two alignments.
 
-    :param args.align1: first alignment
-    :param args.align2: second alignment
-    :param args.score: score to return (sp/f1)
-    :return float: score
+    :param align1: first alignment
+    :param align2: second alignment
+    :param score: score to return (sp/f1)
+    :return str: score, lengths, and similarity
     """
 
-    al1 = get_pairs(args.align1)
-    al2 = get_pairs(args.align2)
+    al1 = get_pairs(align1)
+    al2 = get_pairs(align2)
+
+    if score == 'sp':
+        return sp_score(al1, al2)
+    if score == 'f1':
+        return f1_score(al1, al2)
 
-    if args.score == 'sp':
-        sp_score(al1, al2)
-    if args.score == 'f1':
-        f1_score(al1, al2)
+    return ''
 
 
 def main():
@@ -195,7 +199,7 @@ def main():
     parser.add_argument('-score', type=str, default='sp', help='Comparison score (sp/f1)')
     args = parser.parse_args()
 
-    compare_aligns(args)
+    logger.info(compare_aligns(args.align1, args.align2, args.score))
 
 
 if __name__ == '__main__':
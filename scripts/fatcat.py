@@ -85,7 +85,6 @@ def main():
     args = parser.parse_args()
 
     align1, align2, beg, end = fatcat(args.f1, args.f2)
-    fatcat(args.f1, args.f2)
     id1 = args.f1.split('/')[-1].split('.')[0]
     id2 = args.f2.split('/')[-1].split('.')[0]
 
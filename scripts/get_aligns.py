@@ -6,16 +6,24 @@ __date__ = "09/22/23"
 """
 
 import argparse
+import asyncio
 import datetime
 import os
 import logging
+import multiprocessing
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Optional
 #import tensorflow as tf
+import blosum as bl
+import numpy as np
+import matrix
 import utility as ut
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # peba.py in root
 
-log_filename = 'data/logs/get_aligns.log'  #pylint: disable=C0103
-os.makedirs(os.path.dirname(log_filename), exist_ok=True)
-logging.basicConfig(filename=log_filename, filemode='w',
-                     level=logging.INFO, format='%(message)s')
+SUBS_MATRIX = None  # Set in each worker process by load_matrix()
 
 
 def log_align(ref: str, direc: str, pair: str, method: str) -> bool:
@@ -50,24 +58,67 @@ def get_aligns(seqs):
     """
 
     # Get all pairwise alignments from the fasta files correpsonding to the MSF file
-    pw_aligns = []
-    for i, seq in enumerate(seqs):
-        loop_count = i  # Keep track of number of loops so no repeats occur
-        while loop_count != len(seqs):
-            if seq != seqs[loop_count]:  # Don't want to align a sequence to itself
-                pw_aligns.append(sorted([seq, seqs[loop_count]]))
-            loop_count+=1
+    return [sorted(pair) for pair in combinations(seqs, 2)]
+
+
+def log_errors(tasks: list, errors):
+    """Logs each pair of sequences that a worker process failed to align
+
+    :param tasks: list of tasks given to the workers, first two items are the fasta files
+    :param errors: iterable of None or error message for each task
+    """
+
+    for task, error in zip(tasks, errors):
+        if error is not None:
+            ref, direc, seq1 = task[0].split('/')[-3:]
+            seq2 = task[1].split('/')[-1]
+            logging.info('%s\t%s %s/%s/%s-%s: %s', datetime.datetime.now(), 'failed',
+                          ref, direc, seq1.split('.')[0], seq2.split('.')[0], error)
+
+
+def load_matrix(score: int):
+    """Loads the BLOSUM matrix once per worker process so it is shared by every pair the
+    worker aligns
+
+    :param score: log odds score of substitution matrix
+    """
+
+    global SUBS_MATRIX  #pylint: disable=W0603
+    SUBS_MATRIX = bl.BLOSUM(score)
 
-    return pw_aligns
 
+def blosum_pair(task: tuple) -> Optional[str]:
+    """Aligns one pair of sequences with BLOSUM and writes the alignment in the msf format
 
-def blosum(pw_aligns: list, ref: str, direc: str, method: str):
+    :param task: (file1, file2, method, backend, savefile) for one pair of sequences
+    :return str | None: None if the pair was aligned, otherwise the error message
+    """
+
+    file1, file2, method, backend, savefile = task
+    try:
+        seq1, id1 = ut.parse_fasta(file1)
+        seq2, id2 = ut.parse_fasta(file2)
+        if backend == 'parasail':
+            align1, align2, beg, end = matrix.align_parasail(seq1, seq2, 62, -11.0, -1.0, method)
+        else:
+            align1, align2, beg, end = matrix.align_seqs(seq1, seq2, SUBS_MATRIX,
+                                                         -11.0, -1.0, method)
+        ut.write_msf(align1, align2, id1, id2, 'blosum62', -11.0, -1.0, savefile, beg, end)
+    except Exception as err:  #pylint: disable=W0718
+        return f'{type(err).__name__}: {err}'
+    return None
+
+
+def blosum(pw_aligns: list, ref: str, direc: str, method: str, backend: str,
+            executor: ProcessPoolExecutor):
     """Writes all pairwise SW blosum alignments to a file in the msf format
 
     :param pw_aligns: list of all pairwise combinations of sequences
     :param ref: reference folder
     :param direc: subfolder
     :param method: alignment method
+    :param backend: DP implementation (python or parasail)
+    :param executor: process pool that aligns the pairs
     """
 
     method_direc = f'data/alignments/{method}_blosum'
@@ -78,30 +129,53 @@ def blosum(pw_aligns: list, ref: str, direc: str, method: str):
     if not os.path.isdir(f'{method_direc}/{ref}/{direc}'):
         os.makedirs(f'{method_direc}/{ref}/{direc}')
 
-    # Align each pair of sequences
+    # Gather each pair of sequences that still needs to be aligned
+    tasks = []
     for pair in pw_aligns:
         if not log_align(ref, direc, pair, f'{method}_blosum'):  # Ignore if already aligned
             continue
         seq1, seq2 = pair[0], pair[1]
+        tasks.append((f'data/sequences/{ref}/{direc}/{seq1}',
+                      f'data/sequences/{ref}/{direc}/{seq2}',
+                      method,
+                      backend,
+                      f'{method_direc}/{ref}/{direc}'))
 
-        args = (f'--align {method} '
-                f'--file1 data/sequences/{ref}/{direc}/{seq1} '
-                f'--file2 data/sequences/{ref}/{direc}/{seq2} '
-                f'--gopen -11 '
-                f'--gext -1 '
-                f'--matrix blosum '
-                f'--score 62 '
-                f'--savefile {method_direc}/{ref}/{direc}')
-        os.system(f'python scripts/matrix.py {args}')
+    # Align in worker processes, log any pair that failed and keep going
+    errors = executor.map(blosum_pair, tasks, chunksize=16)
+    log_errors(tasks, errors)
+
+
+def peba_pair(task: tuple) -> Optional[str]:
+    """Aligns one pair of sequences with PEbA and writes the alignment in the msf format
+
+    :param task: (file1, file2, vecs1, vecs2, method, savefile) for one pair of sequences
+    :return str | None: None if the pair was aligned, otherwise the error message
+    """
 
+    import peba as pb  #pylint: disable=C0415
 
-def peba(pw_aligns: list, ref: str, direc: str, method: str):
+    file1, file2, vecs1, vecs2, method, savefile = task
+    try:
+        seq1, id1 = ut.parse_fasta(file1)
+        seq2, id2 = ut.parse_fasta(file2)
+        align1, align2, beg, end = pb.align_seqs(seq1, seq2, vecs1, vecs2, -11.0, -1.0, method)
+        ut.write_msf(align1, align2, id1, id2, 'ProtT5', -11.0, -1.0, savefile, beg, end)
+    except Exception as err:  #pylint: disable=W0718
+        return f'{type(err).__name__}: {err}'
+    return None
+
+
+def peba(pw_aligns: list, ref: str, direc: str, method: str, dtype: str,
+          executor: ProcessPoolExecutor):
     """Writes all pairwise SW peba alignments to a file in the msf format
 
     :param pw_aligns: list of all pairwise combinations of sequences
     :param ref: reference folder
     :param direc: subfolder
     :param method: alignment method
+    :param dtype: precision embeddings are stored in between loading and aligning
+    :param executor: process pool that aligns the pairs
     """
 
     method_direc = f'data/alignments/{method}_peba'
@@ -112,23 +186,38 @@ def peba(pw_aligns: list, ref: str, direc: str, method: str):
     if not os.path.isdir(f'{method_direc}/{ref}/{direc}'):
         os.makedirs(f'{method_direc}/{ref}/{direc}')
 
-    # Align each pair of sequences
-    for pair in pw_aligns:
-        if not log_align(ref, direc, pair, f'{method}_peba'):  # Ignore if already aligned
+    # Gather each pair of sequences that still needs to be aligned
+    pairs = [pair for pair in pw_aligns if log_align(ref, direc, pair, f'{method}_peba')]
+
+    # Load each sequence's embedding once instead of once for every pair it is in
+    embeds, load_errors = {}, {}
+    for seq in {seq for pair in pairs for seq in pair}:
+        try:
+            embed = np.loadtxt(f'data/embeddings/{ref}/{direc}/{seq.split(".")[0]}.txt')
+            embeds[seq] = embed.astype(dtype, copy=False)
+        except Exception as err:  #pylint: disable=W0718
+            load_errors[seq] = f'{type(err).__name__}: {err}'
+
+    # Log pairs with an embedding that couldn't be loaded, align the rest
+    tasks, failed, errors = [], [], []
+    for seq1, seq2 in pairs:
+        if seq1 in load_errors or seq2 in load_errors:
+            failed.append((f'data/sequences/{ref}/{direc}/{seq1}',
+                           f'data/sequences/{ref}/{direc}/{seq2}'))
+            errors.append(load_errors.get(seq1, load_errors.get(seq2)))
             continue
-        seq1, seq2 = pair[0], pair[1]
-        embed1 = seq1.split('.')[0] + '.txt'
-        embed2 = seq2.split('.')[0] + '.txt'
+        tasks.append((f'data/sequences/{ref}/{direc}/{seq1}',
+                      f'data/sequences/{ref}/{direc}/{seq2}',
+                      embeds[seq1],
+                      embeds[seq2],
+                      method,
+                      f'{method_direc}/{ref}/{direc}'))
 
-        args = (f'--align {method} '
-                f'--file1 data/sequences/{ref}/{direc}/{seq1} '
-                f'--file2 data/sequences/{ref}/{direc}/{seq2} '
-                f'--embed1 data/embeddings/{ref}/{direc}/{embed1} '
-                f'--embed2 data/embeddings/{ref}/{direc}/{embed2} '
-                f'--gopen -11 '
-                f'--gext -1 '
-                f'--savefile {method_direc}/{ref}/{direc}')
-        os.system(f'python scripts/peba.py {args}')
+    log_errors(failed, errors)
+
+    # Align in worker processes, log any pair that failed and keep going
+    errors = executor.map(peba_pair, tasks, chunksize=16)
+    log_errors(tasks, errors)
 
 
 def dedal_run(pw_aligns: list, ref: str, direc: str, model):
@@ -176,13 +265,30 @@ def dedal_run(pw_aligns: list, ref: str, direc: str, model):
                      0, 0, f'{method_direc}/{ref}/{direc}', beg, end)
         
 
-def fatcat(pw_aligns: list, ref: str, direc: str):
+async def run_subprocesses(cmds: list, limit: int):
+    """Runs each command as a subprocess, with at most limit of them running at once
+
+    :param cmds: list of commands, each a list of arguments
+    :param limit: maximum number of subprocesses running at once
+    """
+
+    sem = asyncio.Semaphore(limit)
+
+    async def run(cmd: list):
+        async with sem:
+            proc = await asyncio.create_subprocess_exec(*cmd)
+            await proc.wait()
+
+    await asyncio.gather(*(run(cmd) for cmd in cmds))
+
+
+def fatcat(pw_aligns: list, ref: str, direc: str, procs: int):
     """Writes all pairwise fatcat alignments to a file in the desired format
 
     :param pw_aligns: list of all pairwise combinations of sequences
     :param ref: reference folder
     :param direc: subfolder
-    :param method: alignment method
+    :param procs: number of fatcat processes to run at once
     """
 
     if ref != 'RV11':  # only works for RV11, rest don't have pdb files
@@ -198,16 +304,18 @@ def fatcat(pw_aligns: list, ref: str, direc: str):
     if not os.path.isdir(f'{method_direc}/{ref}/{direc}'):
         os.makedirs(f'{method_direc}/{ref}/{direc}')
 
-    # Align each pair of sequences
+    # Align each pair of sequences, each fatcat call is independent so they can run concurrently
+    cmds = []
     for pair in pw_aligns:
         if not log_align(ref, direc, pair, 'fatcat'):  # Ignore if already aligned
             continue
         seq1, seq2 = pair[0], pair[1]
         pdb1, pdb2 = seq1.split('.')[0], seq2.split('.')[0]
-        args = (f'-f1 data/pdb/{direc}/{pdb1}.pdb '
-                f'-f2 data/pdb/{direc}/{pdb2}.pdb '
-                f'-sf {method_direc}/{ref}/{direc}')
-        os.system(f'python scripts/fatcat.py {args}')
+        cmds.append([sys.executable, 'scripts/fatcat.py',
+                     '-f1', f'data/pdb/{direc}/{pdb1}.pdb',
+                     '-f2', f'data/pdb/{direc}/{pdb2}.pdb',
+                     '-sf', f'{method_direc}/{ref}/{direc}'])
+    asyncio.run(run_subprocesses(cmds, procs))
 
 
 def vcmsa(pw_aligns: list, ref: str, direc: str):
@@ -227,10 +335,10 @@ def vcmsa(pw_aligns: list, ref: str, direc: str):
         if not log_align(ref, direc, pair, 'vcmsa'):  # Ignore if already aligned
             continue
         seq1, seq2 = pair[0], pair[1]
-        args = (f'-f1 data/sequences/{ref}/{direc}/{seq1} '
-                f'-f2 data/sequences/{ref}/{direc}/{seq2} '
-                f'-sf {method_direc}/{ref}/{direc}')
-        os.system(f'python scripts/vcmsa.py {args}')
+        subprocess.run([sys.executable, 'scripts/vcmsa.py',
+                        '-f1', f'data/sequences/{ref}/{direc}/{seq1}',
+                        '-f2', f'data/sequences/{ref}/{direc}/{seq2}',
+                        '-sf', f'{method_direc}/{ref}/{direc}'], check=False)
                
 
 def main():
@@ -240,32 +348,51 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-a', type=str, default='blosum')
     parser.add_argument('-m', type=str, default='global')
+    parser.add_argument('-p', type=int, default=os.cpu_count(), help='number of processes')
+    parser.add_argument('-b', type=str, default='python', choices=['python', 'parasail'],
+                        help='blosum DP (python or parasail)')
+    parser.add_argument('-d', type=str, default='float64',
+                        choices=['float64', 'float32', 'float16'],
+                        help='peba embedding storage precision (float64, float32, or float16)')
     args = parser.parse_args()
+    if args.b == 'parasail' and not matrix.PARASAIL_AVAILABLE:
+        parser.error('parasail backend requires the parasail package')
+
+    log_filename = 'data/logs/get_aligns.log'
+    os.makedirs(os.path.dirname(log_filename), exist_ok=True)
+    logging.basicConfig(filename=log_filename, filemode='w',
+                     level=logging.INFO, format='%(message)s')
 
     # Don't want to load if not using
     if args.a == 'dedal':
         dedal_model = tf.saved_model.load('dedal_3')
 
-    refs = os.listdir('data/BAliBASE_R1-5')
-    for ref in refs:
-
-        # Get all fasta files in reference folder
-        seq_dir = os.listdir(f'data/sequences/{ref}')
-        for direc in seq_dir:
-
-            # Get pairwise alignments for each pair of sequences
-            files = os.listdir(f'data/sequences/{ref}/{direc}')
-            pw_aligns = get_aligns(files)
-            if args.a == 'blosum':
-                blosum(pw_aligns, ref, direc, args.m)
-            elif args.a == 'peba':
-                peba(pw_aligns, ref, direc, args.m)
-            elif args.a == 'dedal':
-                dedal_run(pw_aligns, ref, direc, dedal_model)
-            elif args.a == 'fatcat':
-                fatcat(pw_aligns, ref, direc)
-            elif args.a == 'vcmsa':
-                vcmsa(pw_aligns, ref, direc)
+    # Worker processes are started once and reused for every pair of sequences, they are forked
+    # from a server that has already imported this script's modules (and torch for peba)
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['__main__', 'peba'] if args.a == 'peba' else ['__main__'])
+    with ProcessPoolExecutor(max_workers=args.p, mp_context=ctx, initializer=load_matrix,
+                              initargs=(62,)) as executor:
+        refs = os.listdir('data/BAliBASE_R1-5')
+        for ref in refs:
+
+            # Get all fasta files in reference folder
+            seq_dir = os.listdir(f'data/sequences/{ref}')
+            for direc in seq_dir:
+
+                # Get pairwise alignments for each pair of sequences
+                files = os.listdir(f'data/sequences/{ref}/{direc}')
+                pw_aligns = get_aligns(files)
+                if args.a == 'blosum':
+                    blosum(pw_aligns, ref, direc, args.m, args.b, executor)
+                elif args.a == 'peba':
+                    peba(pw_aligns, ref, direc, args.m, args.d, executor)
+                elif args.a == 'dedal':
+                    dedal_run(pw_aligns, ref, direc, dedal_model)
+                elif args.a == 'fatcat':
+                    fatcat(pw_aligns, ref, direc, args.p)
+                elif args.a == 'vcmsa':
+                    vcmsa(pw_aligns, ref, direc)
 
 
 if __name__ == '__main__':
@@ -9,6 +9,32 @@ import argparse
 import blosum as bl
 import utility as ut
 
+try:  # parasail is optional, alignments use score_align() without it
+    import parasail
+    PARASAIL_AVAILABLE = True
+except ImportError:
+    PARASAIL_AVAILABLE = False
+
+
+def pair_scores(seq1: str, seq2: str, subs_matrix) -> tuple:
+    """Returns the substitution score of every pair of distinct residues between two sequences
+    and the index of each residue in that table
+
+    :param seq1: first sequence
+    :param seq2: second sequence
+    :param subs_matrix: substitution scoring matrix (i.e. BLOSUM62)
+    return (list, list, list): nested list of scores between distinct residues, row index of each
+      residue in seq1, column index of each residue in seq2
+    """
+
+    # Look up each pair of distinct residues once, then index the table by residue
+    chars1, chars2 = sorted(set(seq1)), sorted(set(seq2))
+    table = [[subs_matrix[f'{char1}{char2}'] for char2 in chars2] for char1 in chars1]
+    idx1 = [chars1.index(char) for char in seq1]
+    idx2 = [chars2.index(char) for char in seq2]
+
+    return table, idx1, idx2
+
 
 def score_align(seq1: str, seq2: str, subs_matrix, gopen: float, gext: float, align: str) -> tuple:
     """Returns scoring and traceback matrices of optimal scores for the alignment of sequences
@@ -26,12 +52,14 @@ def score_align(seq1: str, seq2: str, subs_matrix, gopen: float, gext: float, al
     # Initialize scoring and traceback matrix based on sequence lengths
     score_m, trace_m = ut.initialize_matrices(seq1, seq2, align, gopen, gext)
 
+    # Substitution score of each pair of residues
+    table, idx1, idx2 = pair_scores(seq1, seq2, subs_matrix)
+
     # Score matrix by moving through each index
     gap = False
-    for i, char in enumerate(seq1):
-        seq1_char = char  # Character in 1st sequence
-        for j, char in enumerate(seq2):
-            seq2_char = char  # Character in 2nd sequence
+    for i in range(len(seq1)):
+        seq1_scores = table[idx1[i]]  # Scores of residue in 1st sequence against each residue
+        for j in range(len(seq2)):
 
             # Preceding scoring matrix values
             diagonal = score_m[i][j]
@@ -39,8 +67,7 @@ def score_align(seq1: str, seq2: str, subs_matrix, gopen: float, gext: float, al
             vertical = score_m[i][j+1]
 
             # Get score from substitution matrix and add to scoring matrix values
-            matrix_score = subs_matrix[f'{seq1_char}{seq2_char}']
-            diagonal += matrix_score
+            diagonal += seq1_scores[idx2[j]]
             horizontal, vertical = ut.gap_penalty(gap, horizontal, vertical, gopen, gext)
 
             # Assign value to traceback matrix and update gap status
@@ -56,6 +83,62 @@ def score_align(seq1: str, seq2: str, subs_matrix, gopen: float, gext: float, al
     return score_m, trace_m
 
 
+def align_seqs(seq1: str, seq2: str, subs_matrix, gopen: float, gext: float, align: str) -> tuple:
+    """Returns the highest scoring alignment of two sequences using a substitution matrix
+
+    :param seq1: first sequence
+    :param seq2: second sequence
+    :param subs_matrix: substitution scoring matrix (i.e. BLOSUM62)
+    :param gopen: gap penalty for opening a new gap
+    :param gext: gap penalty for extending a gap
+    :param align: alignment type (global or local)
+    return (str, str, list, list): aligned sequences, beg/end positions of each seq
+    """
+
+    score_m, trace_m = score_align(seq1, seq2, subs_matrix, gopen, gext, align)
+    if align == 'global':
+        align1, align2 = ut.global_traceback(trace_m, seq1, seq2)
+        beg, end = [0, 0], [len(seq1), len(seq2)]
+    if align == 'local':
+        align1, align2, beg, end = ut.local_traceback(score_m, trace_m, seq1, seq2)
+
+    return align1, align2, beg, end
+
+
+def align_parasail(seq1: str, seq2: str, score: int, gopen: float, gext: float, align: str) -> tuple:
+    """Returns the highest scoring alignment of two sequences using parasail's SIMD NW/SW with a
+    BLOSUM matrix
+
+    :param seq1: first sequence
+    :param seq2: second sequence
+    :param score: log odds score of BLOSUM matrix
+    :param gopen: gap penalty for opening a new gap
+    :param gext: gap penalty for extending a gap
+    :param align: alignment type (global or local)
+    return (str, str, list, list): aligned sequences, beg/end positions of each seq
+    """
+
+    # parasail takes positive integer penalties, opening penalty includes first gap position
+    if gopen != int(gopen) or gext != int(gext):
+        raise ValueError(f'parasail gap penalties must be integers, got {gopen} and {gext}')
+    matrix = getattr(parasail, f'blosum{score}')
+    gopen, gext = int(-gopen), int(-gext)
+    if align == 'global':
+        result = parasail.nw_trace_striped_16(seq1, seq2, gopen, gext, matrix)
+        beg, end = [0, 0], [len(seq1), len(seq2)]
+    if align == 'local':
+        result = parasail.sw_trace_striped_16(seq1, seq2, gopen, gext, matrix)
+        end = [result.end_query+1, result.end_ref+1]  # parasail end positions are 0-based
+    align1 = result.traceback.query.replace('-', '.')
+    align2 = result.traceback.ref.replace('-', '.')
+
+    # Cigar begin offsets don't account for leading gaps, get begin from end and aligned length
+    if align == 'local':
+        beg = [end[0] - len(align1.replace('.', '')), end[1] - len(align2.replace('.', ''))]
+
+    return align1, align2, beg, end
+
+
 def main():
     """Initializes two protein sequences and a scoring matrix, calls SW_align() to get
     the scoring and traceback matrix from SW alignment, calls traceback() to get the local
@@ -72,7 +155,16 @@ def main():
     parser.add_argument('-s', '--score', type=int, default=62, help='Log odds score of subsitution matrix')
     parser.add_argument('-o', '--output', type=str, default='msf', help='Output format (msf or fa)')
     parser.add_argument('-sf', '--savefile', type=str, help='Filename to save alignment to')
+    parser.add_argument('-b', '--backend', type=str, default='python', choices=['python', 'parasail'],
+                        help='DP implementation (python or parasail, parasail needs blosum and integer gaps)')
     args = parser.parse_args()
+    if args.backend == 'parasail' and not PARASAIL_AVAILABLE:
+        parser.error('parasail backend requires the parasail package')
+    if args.backend == 'parasail' and args.matrix != 'blosum':
+        parser.error('parasail backend only supports the blosum matrix')
+    if args.backend == 'parasail' and (args.gopen != int(args.gopen) or
+                                      args.gext != int(args.gext)):
+        parser.error('parasail backend requires integer gap penalties')
 
     # Parse fasta files for sequences and ids
     seq1, id1 = ut.parse_fasta(args.file1)
@@ -85,12 +177,12 @@ def main():
         matrix = ut.parse_matrix('data/PFASUM60.txt')
 
     # Align and traceback
-    score_m, trace_m = score_align(seq1, seq2, matrix, args.gopen, args.gext, args.align)
-    if args.align == 'global':
-        align1, align2 = ut.global_traceback(trace_m, seq1, seq2)
-        beg, end = [0, 0], [len(seq1), len(seq2)]
-    if args.align == 'local':
-        align1, align2, beg, end = ut.local_traceback(score_m, trace_m, seq1, seq2)
+    if args.backend == 'parasail':
+        align1, align2, beg, end = align_parasail(seq1, seq2, args.score,
+                                                   args.gopen, args.gext, args.align)
+    else:
+        align1, align2, beg, end = align_seqs(seq1, seq2, matrix,
+                                               args.gopen, args.gext, args.align)
 
     # Write align based on desired output format
     if args.output == 'msf':
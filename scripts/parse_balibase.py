@@ -7,7 +7,15 @@ __date__ = 09/21/23
 """
 
 import os
-from Bio import SeqIO
+from itertools import combinations
+import numpy as np
+import utility as ut
+
+try:  # numba is optional, gaps are stripped with numpy masks without it
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 
 def parse_ref_folder(path: str) -> tuple:
@@ -48,44 +56,90 @@ def parse_fasta(filename: str, bb_dir: str) -> list:
     if not os.path.isdir(f'{bb_dir}/{famname}'):
         os.makedirs(f'{bb_dir}/{famname}')
 
-    # Parse fasta file and write each sequence to its own file in the corresponding folder
-    seq = ''
+    # Split fasta file on each header and write each record to its own file in the corresponding
+    # folder, first word of the header is the sequence id
     seqs = []
-    with open(filename, 'r', encoding='utf8') as file:
-        for seq in SeqIO.parse(file, 'fasta'):
-            SeqIO.write(seq, f'{bb_dir}/{famname}/{seq.id}.fa', 'fasta')
-            seqs.append(f'{seq.id}.fa')
+    with open(filename, 'rb') as file:
+        records = file.read().strip().lstrip(b'>').split(b'\n>')
+    for record in records:
+        if not record:
+            continue
+        seq_id = record.split(None, 1)[0].decode('utf8')
+        with open(f'{bb_dir}/{famname}/{seq_id}.fa', 'wb') as seqfile:
+            seqfile.write(b'>' + record.rstrip() + b'\n')
+        seqs.append(f'{seq_id}.fa')
 
     return seqs
 
 
-def parse_msf(filename: str, id1: str, id2: str) -> tuple:
-    """Returns the pairwise alignment of two sequences from an MSF file
+def parse_msf_all(filename: str) -> dict:
+    """Returns every aligned sequence in an MSF file, reading the file only once
 
     :param filename: name of file
-    :param id1: first sequence id
-    :param id2: second sequence id
-    return (str, str): align1, align2 - corresponding pairwise alignments
+    return dict: dict where key is sequence id and value is aligned sequence (bytearray)
     """
 
-    seq1 = []
-    seq2 = []
-    with open(filename, 'r', encoding='utf8') as file:
+    seqs = {}
+    with open(filename, 'rb') as file:
         for line in file:  # Get each sequence
-            if line.startswith(id1):
-                seq1.append(''.join(line.split()[1:]))
-            elif line.startswith(id2):
-                seq2.append(''.join(line.split()[1:]))
-
-    # Go through both sequences and remove positions with gaps in both
-    seq1 = list(''.join(seq1))
-    seq2 = list(''.join(seq2))
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == b'Name:':  # Header line with sequence id
+                seqs[parts[1]] = bytearray()
+            elif parts[0] in seqs:
+                seqs[parts[0]].extend(b''.join(parts[1:]))
+
+    return {seq_id.decode('utf8'): seq for seq_id, seq in seqs.items()}
+
+
+def _strip_double_gaps(seq1: np.ndarray, seq2: np.ndarray) -> tuple:
+    """Returns both sequences with positions that are gaps in both removed, in a single pass
+
+    :param seq1: first aligned sequence as uint8 array
+    :param seq2: second aligned sequence as uint8 array
+    return (np.ndarray, np.ndarray): sequences without shared gaps
+    """
+
+    align1 = np.empty_like(seq1)
+    align2 = np.empty_like(seq2)
+    count = 0
     for i in range(len(seq1)):  # pylint: disable=C0200
-        if seq1[i] == '.' and seq2[i] == '.':
-            seq1[i] = ''
-            seq2[i] = ''
-    align1 = ''.join(seq1)
-    align2 = ''.join(seq2)
+        if seq1[i] != 46 or seq2[i] != 46:  # 46 is the byte value of '.'
+            align1[count] = seq1[i]
+            align2[count] = seq2[i]
+            count += 1
+
+    return align1[:count], align2[:count]
+
+
+if NUMBA_AVAILABLE:
+    _strip_double_gaps = njit(cache=True)(_strip_double_gaps)
+
+
+def strip_gaps(seq1: bytes, seq2: bytes) -> tuple:
+    """Returns the pairwise alignment of two sequences from an MSA, with columns that are gaps
+    in both sequences removed
+
+    :param seq1: first aligned sequence from MSA
+    :param seq2: second aligned sequence from MSA
+    return (str, str): align1, align2 - corresponding pairwise alignments
+    """
+
+    # Rows of different length can't be compared column by column (njit doesn't bounds check)
+    if len(seq1) != len(seq2):
+        raise ValueError(f'aligned sequences differ in length ({len(seq1)} != {len(seq2)})')
+
+    # Remove positions with gaps in both sequences, 46 is the byte value of '.'
+    seq1 = np.frombuffer(seq1, dtype=np.uint8)
+    seq2 = np.frombuffer(seq2, dtype=np.uint8)
+    if NUMBA_AVAILABLE:
+        seq1, seq2 = _strip_double_gaps(seq1, seq2)
+    else:
+        mask = (seq1 != 46) | (seq2 != 46)
+        seq1, seq2 = seq1[mask], seq2[mask]
+    align1 = seq1.tobytes().decode('ascii')
+    align2 = seq2.tobytes().decode('ascii')
 
     return align1, align2
 
@@ -104,15 +158,9 @@ def write_align(seq1: str, seq2: str, id1: str, id2: str, path: str):
     alength = len(seq1)  # Length of alignment
     length1, length2 = len(seq1.strip('.')), len(seq2.strip('.'))  # Length of seqs
 
-    # Add space every 10 characters
-    seq1 = [seq1[i:i+10] for i in range(0, len(seq1), 10)]
-    seq1 = ' '.join(seq1)
-    seq2 = [seq2[i:i+10] for i in range(0, len(seq2), 10)]
-    seq2 = ' '.join(seq2)
-
-    # Split sequences every 50 characters
-    seq1_split = [seq1[i:i+55] for i in range(0, len(seq1), 55)]
-    seq2_split = [seq2[i:i+55] for i in range(0, len(seq2), 55)]
+    # Split sequences every 50 characters with a space every 10 characters
+    seq1_split = ut.split_msf(seq1)
+    seq2_split = ut.split_msf(seq2)
 
     # Add extra spaces to either id if they are not the same length
     if len(id1) != len(id2):
@@ -121,15 +169,15 @@ def write_align(seq1: str, seq2: str, id1: str, id2: str, path: str):
         else:
             id1 = id1 + ' ' * (len(id2) - len(id1))
 
-    # Write to a new line for every index in the split list i.e. every 55 characters
+    # New line for every index in the split list i.e. every 55 characters, written all at once
+    lines = ['PileUp\n\n\n\n',
+             f'   MSF:  {alength}  Type:  P\n\n',
+             f' Name: {id1} oo  Len:  {alength}  Start/End:  {0},{length1}\n',
+             f' Name: {id2} oo  Len:  {alength}  Start/End:  {0},{length2}\n\n//\n\n\n\n']
+    for line1, line2 in zip(seq1_split, seq2_split):
+        lines.append(f'{id1}      {line1}\n{id2}      {line2}\n\n')
     with open(f'{path}', 'w', encoding='utf8') as file:
-        file.write('PileUp\n\n\n\n')
-        file.write(f'   MSF:  {alength}  Type:  P\n\n')
-        file.write(f' Name: {id1} oo  Len:  {alength}  Start/End:  {0},{length1}\n')
-        file.write(f' Name: {id2} oo  Len:  {alength}  Start/End:  {0},{length2}\n\n//\n\n\n\n')
-        for i in range(len(seq1_split)):  # pylint: disable=C0200
-            file.write(f'{id1}      {seq1_split[i]}\n')
-            file.write(f'{id2}      {seq2_split[i]}\n\n')
+        file.write(''.join(lines))
 
 
 def get_aligns(seqs):
@@ -139,15 +187,7 @@ def get_aligns(seqs):
     """
 
     # Get all pairwise alignments from the fasta files correpsonding to the MSF file
-    pw_aligns = []
-    for i, seq in enumerate(seqs):
-        loop_count = i  # Keep track of number of loops so no repeats occur
-        while loop_count != len(seqs):
-            if seq != seqs[loop_count]:  # Don't want to align a sequence to itself
-                pw_aligns.append(sorted([seq, seqs[loop_count]]))
-            loop_count+=1
-
-    return pw_aligns
+    return [sorted(pair) for pair in combinations(seqs, 2)]
 
 
 def parse_align_files(msf_files: list, fasta_files: list, seq_dir: str, align_dir: str):
@@ -169,21 +209,17 @@ def parse_align_files(msf_files: list, fasta_files: list, seq_dir: str, align_di
     # Each MSF files corresponds to a set of fasta files
     for i, file in enumerate(msf_files):
         ref_align = file.rsplit('/', maxsplit=1)[-1].strip('.msf')  # Get name of ref alignment
-        pw_aligns = get_aligns(seqs[i])
-
-        # For the selected pairs, get PW alignment from ref MSA
-        for pair in pw_aligns:
-            seq1 = pair[0]
-            seq2 = pair[1]
-
-            # Grab pairwise alignment from reference MSA
-            seq1, seq2 = seq1.split('.')[0], seq2.split('.')[0]  # Remove fa
-            align1, align2 = parse_msf(file, seq1, seq2)  # Gather pairwise alignment
-            dir_path = f'{align_dir}/{ref_align}'
-            if not os.path.isdir(dir_path):
-                os.makedirs(dir_path)
-            file_path = f'{align_dir}/{ref_align}/'
-            write_align(align1, align2, seq1, seq2, file_path)  # Write pairwise alignment
+        msa = parse_msf_all(file)  # Read every aligned sequence from ref MSA once
+        ids = {seq: seq.split('.')[0] for seq in seqs[i]}  # Remove fa
+        file_path = f'{align_dir}/{ref_align}/'
+        if not os.path.isdir(file_path):
+            os.makedirs(file_path)
+
+        # For the selected pairs, grab pairwise alignment from ref MSA and write it
+        for seq1, seq2 in get_aligns(seqs[i]):
+            seq1, seq2 = ids[seq1], ids[seq2]
+            align1, align2 = strip_gaps(msa[seq1], msa[seq2])
+            write_align(align1, align2, seq1, seq2, file_path)
 
 
 def main():
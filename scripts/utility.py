@@ -4,9 +4,25 @@ __author__ = "Ben Iovino"
 __date__ = 09/19/23
 """
 
+import re
 import numpy as np
 from Bio import SeqIO
 
+MSF_BLOCK = re.compile(r'(.{10})(?=.)')  # Every 10 characters that are followed by more
+
+
+def split_msf(seq: str) -> list:
+    """Returns aligned sequence as msf lines of 50 characters with a space every 10 characters
+
+    :param seq: aligned sequence
+    return list: lines of the aligned sequence
+    """
+
+    # Add space every 10 characters, then split every 50 characters (55 with spaces)
+    seq = MSF_BLOCK.sub(r'\1 ', seq)
+
+    return [seq[i:i+55] for i in range(0, len(seq), 55)]
+
 
 def write_msf(seq1: str, seq2: str, id1: str, id2: str, method: str,
                gopen: float, gext: float, path: str, beg: list, end: list):
@@ -26,15 +42,9 @@ def write_msf(seq1: str, seq2: str, id1: str, id2: str, method: str,
 
     fpath = f'{path}/{id1}-{id2}.msf'
 
-    # Add space every 10 characters
-    seq1 = [seq1[i:i+10] for i in range(0, len(seq1), 10)]
-    seq1 = ' '.join(seq1)
-    seq2 = [seq2[i:i+10] for i in range(0, len(seq2), 10)]
-    seq2 = ' '.join(seq2)
-
-    # Split sequences every 50 characters
-    seq1_split = [seq1[i:i+55] for i in range(0, len(seq1), 55)]
-    seq2_split = [seq2[i:i+55] for i in range(0, len(seq2), 55)]
+    # Split sequences every 50 characters with a space every 10 characters
+    seq1_split = split_msf(seq1)
+    seq2_split = split_msf(seq2)
 
     # Add extra spaces to either id if they are not the same length
     if len(id1) != len(id2):
@@ -44,14 +54,14 @@ def write_msf(seq1: str, seq2: str, id1: str, id2: str, method: str,
             id1 = id1 + ' ' * (len(id2) - len(id1))
 
     # Put alignment in string format
-    length = len(seq1)
-    alignment = 'PileUp\n\n\n\n'
-    alignment += f'   MSF: {length}  Type: P  Method: {method}  Gopen: {gopen}  Gext: {gext}\n\n'
-    alignment += f' Name: {id1} oo  Len:  {length}  Start/End:  {beg[0]},{end[0]}\n'
-    alignment += f' Name: {id2} oo  Len:  {length}  Start/End:  {beg[1]},{end[1]}\n\n//\n\n\n\n'
-    for i in range(len(seq1_split)): # pylint: disable=C0200
-        alignment += f'{id1}      {seq1_split[i]}\n'
-        alignment += f'{id2}      {seq2_split[i]}\n\n'
+    length = sum(len(line) for line in seq1_split)
+    lines = ['PileUp\n\n\n\n',
+             f'   MSF: {length}  Type: P  Method: {method}  Gopen: {gopen}  Gext: {gext}\n\n',
+             f' Name: {id1} oo  Len:  {length}  Start/End:  {beg[0]},{end[0]}\n',
+             f' Name: {id2} oo  Len:  {length}  Start/End:  {beg[1]},{end[1]}\n\n//\n\n\n\n']
+    for line1, line2 in zip(seq1_split, seq2_split):
+        lines.append(f'{id1}      {line1}\n{id2}      {line2}\n\n')
+    alignment = ''.join(lines)
 
     # If no path is determined then print to console, otherwise write to file
     if path == 'n':
@@ -80,12 +90,8 @@ def write_fasta(seq1: str, seq2: str, id1: str, id2: str, path: str):
     seq2_split = [seq2[i:i+50] for i in range(0, len(seq2), 50)]
 
     # Put alignment in string format
-    alignment = f'>{id1}\n'
-    for i in range(len(seq1_split)):  # pylint: disable=C0200
-        alignment += f'{seq1_split[i]}\n'
-    alignment += f'>{id2}\n'
-    for i in range(len(seq2_split)):  # pylint: disable=C0200
-        alignment += f'{seq2_split[i]}\n'
+    alignment = ''.join([f'>{id1}\n', *(f'{line}\n' for line in seq1_split),
+                         f'>{id2}\n', *(f'{line}\n' for line in seq2_split)])
 
     # If no path is determined then print to console, otherwise write to file
     if path == 'n':